@@ -0,0 +1,87 @@
+"""
+Recall-vs-latency benchmark: local ANN (IVF) search against exact search.
+
+Queries come from eval_data.json. With --scale N the real catalog is padded
+with N synthetic vectors (jittered copies of real ones, in their own
+"synthetic" partition) to emulate a large multi-catalog deployment.
+
+Run from the repo root:
+    python -m Evaluation.ann_benchmark --scale 300000
+"""
+import os
+import json
+import time
+import argparse
+import numpy as np
+from sentence_transformers import SentenceTransformer
+from core.ann_index import ANNIndex, ANN_INDEX_DIR
+
+EVAL_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "eval_data.json")
+
+
+def add_synthetic(index: ANNIndex, n: int, noise: float = 0.35, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    base = np.concatenate([p.vectors[:p.size][p.alive[:p.size]] for p in index.partitions.values()])
+    batch = 50_000
+    for start in range(0, n, batch):
+        size = min(batch, n - start)
+        picks = base[rng.integers(0, len(base), size)]
+        vectors = picks + noise * rng.normal(size=picks.shape).astype(np.float32) / np.sqrt(index.dim)
+        ids = [f"synthetic-{i}" for i in range(start, start + size)]
+        index.upsert(ids, vectors, [{} for _ in ids], catalog="synthetic")
+
+
+def timed_search(index: ANNIndex, queries: np.ndarray, top_k: int, **kwargs):
+    """One query at a time, matching the request path."""
+    results, latencies = [], []
+    for q in queries:
+        start = time.perf_counter()
+        results.append(index.search(q[None, :], top_k=top_k, **kwargs)[0])
+        latencies.append((time.perf_counter() - start) * 1000)
+    return results, latencies
+
+
+def recall(approx, exact) -> float:
+    scores = []
+    for a, e in zip(approx, exact):
+        truth = {h["id"] for h in e}
+        scores.append(len({h["id"] for h in a} & truth) / len(truth) if truth else 1.0)
+    return float(np.mean(scores))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--index", default=ANN_INDEX_DIR)
+    parser.add_argument("--scale", type=int, default=0, help="Number of synthetic vectors to add")
+    parser.add_argument("--top-k", type=int, nargs="+", default=[10, 60])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    index = ANNIndex.load(args.index)
+    if args.scale:
+        print(f"Adding {args.scale} synthetic vectors...")
+        start = time.perf_counter()
+        add_synthetic(index, args.scale)
+        print(f"Build/train time: {time.perf_counter() - start:.1f}s")
+    print(f"Index size: {len(index)} vectors across {list(index.partitions)}")
+
+    with open(EVAL_DATA) as f:
+        eval_data = json.load(f)
+    model = SentenceTransformer("all-MiniLM-L6-v2")
+    queries = np.asarray(model.encode([e["query"] for e in eval_data]), dtype=np.float32)
+
+    for k in args.top_k:
+        exact, exact_ms = timed_search(index, queries, k, exact=True)
+        print(f"\ntop_k={k}")
+        print(f"{'mode':<12}{'recall':>8}{'p50 ms':>10}{'p95 ms':>10}")
+        print(f"{'exact':<12}{1.0:>8.3f}{np.percentile(exact_ms, 50):>10.2f}{np.percentile(exact_ms, 95):>10.2f}")
+        for nprobe in args.nprobe:
+            approx, approx_ms = timed_search(index, queries, k, nprobe=nprobe)
+            print(
+                f"{'nprobe=' + str(nprobe):<12}{recall(approx, exact):>8.3f}"
+                f"{np.percentile(approx_ms, 50):>10.2f}{np.percentile(approx_ms, 95):>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
+import sys
 import json
-from core.retrieval import retrieve_and_rerank
+from core.retrieval import retrieve_and_rerank, retrieve_candidates
 
 def recall_at_k(predicted, relevant, k):
     if not relevant:
@@ -61,11 +62,31 @@ def evaluate(eval_data, k=10):
         # f"Success@{k}": round(sum(success_scores) / len(success_scores), 4)
     }
 
+def evaluate_candidates(eval_data, top_k=60):
+    """Recall of the pre-rerank candidate set (no LLM calls) — compare before/after retrieval changes."""
+    recall_scores = []
+    sizes = []
+
+    for entry in eval_data:
+        matches = retrieve_candidates(entry["query"], top_k)
+        predicted = [m["metadata"].get("Test Name") for m in matches]
+        recall_scores.append(recall_at_k(predicted, entry["relevant_names"], len(predicted)))
+        sizes.append(len(predicted))
+        print(f"🔍 {entry['query'][:80]}... -> {len(predicted)} candidates, recall {recall_scores[-1]:.4f}")
+
+    return {
+        "Mean Candidate Recall": round(sum(recall_scores) / len(recall_scores), 4),
+        "Mean Candidates": round(sum(sizes) / len(sizes), 1),
+    }
+
 if __name__ == "__main__":
     with open("eval_data.json") as f:
         eval_data = json.load(f)
 
-    results = evaluate(eval_data, k=10)
+    if "--candidates" in sys.argv:
+        results = evaluate_candidates(eval_data)
+    else:
+        results = evaluate(eval_data, k=10)
 
     print("Final Evaluation Metrics:")
     for key, value in results.items():
@@ -1,28 +1,22 @@
-from fastapi import FastAPI, HTTPException
+import gradio as gr
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import List
-from core.llm_processor import preprocess_input
-from core.retrieval import retrieve_and_rerank
+from core.pipeline import recommend
+from core.retrieval import vector_client
+from core.catalog_records import catalog_store
+import app as ui
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 @app.get("/health", status_code=200)
 def health_check():
     return {"status": "ok"}
 
-TEST_TYPE_MAP = {
-    "A": "Ability & Aptitude",
-    "B": "Biodata & Situational Judgement",
-    "C": "Competencies",
-    "D": "Development & 360",
-    "E": "Assessment Exercises",
-    "K": "Knowledge & Skills",
-    "P": "Personality & Behavior",
-    "S": "Simulations"
-}
-
-def decode_test_type(code: str) -> str:
-    return ", ".join(TEST_TYPE_MAP.get(c.strip(), c) for c in code if c.strip() in TEST_TYPE_MAP)
+@app.get("/metrics", status_code=200)
+def vector_store_metrics():
+    return vector_client.metrics()
 
 class RecommendationRequest(BaseModel):
     input: str
@@ -37,31 +31,28 @@ class Assessment(BaseModel):
     Test_Type: str
 
 @app.post("/recommend", response_model=List[Assessment])
-def recommend_assessments(payload: RecommendationRequest):
+async def recommend_assessments(payload: RecommendationRequest):
     try:
         if not payload.input or not payload.input.strip():
             raise HTTPException(status_code=400, detail="Input cannot be empty.")
 
-        refined_query = preprocess_input(payload.input)
-        results = retrieve_and_rerank(refined_query)
+        results = await recommend(payload.input)
 
         if not results:
             raise HTTPException(status_code=404, detail="No relevant assessments found.")
 
-        return [
-            {
-                "Test_Name": r.get("Test Name", ""),
-                "URL": r.get("Test Link", ""),
-                "Description": r.get("Description", ""),
-                "Duration": r.get("Assessment Length", ""),
-                "Remote_Support": r.get("Remote Support") or "No",
-                "Adaptive_Support": r.get("Adaptive Support") or "No",
-                "Test_Type": decode_test_type(r.get("Test Type", "")),
-            }
-            for r in results[:10]
-        ]
+        # payloads are pre-encoded per catalog record; just join them by ID
+        content = catalog_store.api_json([r["id"] for r in results[:10]])
+        if content is None:
+            raise HTTPException(status_code=404, detail="No relevant assessments found.")
+
+        return Response(content=content, media_type="application/json")
 
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
+# Serve the Gradio UI from this process so both front ends share one model,
+# one vector-store client and one result cache:  uvicorn api:app  ->  /ui
+app = gr.mount_gradio_app(app, ui.demo, path="/ui")
@@ -1,73 +1,67 @@
-import tempfile
+import os
 import gradio as gr
-from core.llm_processor import preprocess_input
-from core.retrieval import retrieve_and_rerank
+from core.pipeline import recommend
+from core.exports import TempFileManager
+from core.catalog_records import catalog_store
 import pandas as pd
 
-TEST_TYPE_MAP = {
-    "A": "Ability & Aptitude",
-    "B": "Biodata & Situational Judgement",
-    "C": "Competencies",
-    "D": "Development & 360",
-    "E": "Assessment Exercises",
-    "K": "Knowledge & Skills",
-    "P": "Personality & Behavior",
-    "S": "Simulations"
-}
+QUEUE_CONCURRENCY = int(os.getenv("GRADIO_CONCURRENCY", "8"))
+QUEUE_MAX_SIZE = int(os.getenv("GRADIO_QUEUE_SIZE", "64"))
 
-def decode_test_type(code: str) -> str:
-    return ", ".join(TEST_TYPE_MAP.get(c.strip(), c) for c in code if c.strip() in TEST_TYPE_MAP)
+EXPORT_MAX_AGE = int(os.getenv("EXPORT_MAX_AGE", "900"))
 
-def format_results(raw_results):
-    formatted = []
-    for r in raw_results:
-        formatted.append({
-            "Test Name": r.get("Test Name", ""),
-            "URL": r.get("Test Link", ""),
-            "Description": r.get("Description", ""),
-            "Duration": r.get("Assessment Length", ""),
-            "Remote Support": r.get("Remote Support") if r.get("Remote Support") else "No",
-            "Adaptive Support": r.get("Adaptive Support") if r.get("Adaptive Support") else "No",
-            "Test Type": decode_test_type(r.get("Test Type", "")),
-        })
-    return pd.DataFrame(formatted)
+exports = TempFileManager(
+    max_files=int(os.getenv("EXPORT_MAX_FILES", "100")),
+    max_age=EXPORT_MAX_AGE,
+)
 
-def format_results_for_display(raw_results):
-    return pd.DataFrame(raw_results)
+def format_results(raw_results):
+    return pd.DataFrame(catalog_store.ui_rows([r["id"] for r in raw_results]))
 
-def recommend_with_download(query_input: str):
+async def recommend_for_ui(query_input: str):
     try:
         print(" Received:", query_input)
-        refined_query = preprocess_input(query_input)
-        print(" Refined:", refined_query)
+        if not query_input or not query_input.strip():
+            return "Input cannot be empty.", pd.DataFrame(), None
 
-        results = retrieve_and_rerank(refined_query)
+        results = await recommend(query_input)
         if not results:
             return "No results found", pd.DataFrame(), None
 
-        df = format_results(results)
-
-        # Save to temp file
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".csv", mode="w", newline="", encoding="utf-8")
-        df.to_csv(temp_file.name, index=False)
-        temp_file.close()
-
-        return f"{len(df)} results found.", df, temp_file.name
+        df = format_results(results[:10])
+        if df.empty:
+            return "No results found", pd.DataFrame(), None
+        # the DataFrame is kept in session state; the CSV is only built on export
+        return f"{len(df)} results found.", df, df
 
     except Exception as e:
         print(" Error:", e)
         return str(e), pd.DataFrame(), None
 
+def export_csv(df):
+    if df is None or df.empty:
+        return None
+    return exports.write(df.to_csv(index=False).encode("utf-8"))
+
 # === Gradio UI ===
-gr.Interface(
-    fn=recommend_with_download,
-    inputs=gr.Textbox(label="Enter your query, job description, or URL"),
-    outputs=[
-        gr.Textbox(label="Status"),
-        gr.Dataframe(label="Top 10 Recommended Assessments", wrap=True),
-        gr.File(label="📥Download CSV")
-    ],
-    title="SHL Assessment Recommender",
-    description="Paste a natural language query, a full JD, or a JD URL to get the top 10 assessment matches.",
-    allow_flagging="never"
-).launch()
+# Gradio copies every file returned to gr.File into its own cache; sweep that
+# copy on the same schedule as ours: (check every N seconds, delete older than N)
+with gr.Blocks(title="SHL Assessment Recommender", delete_cache=(EXPORT_MAX_AGE, EXPORT_MAX_AGE)) as demo:
+    gr.Markdown("# SHL Assessment Recommender\nPaste a natural language query, a full JD, or a JD URL to get the top 10 assessment matches.")
+    query_box = gr.Textbox(label="Enter your query, job description, or URL")
+    submit_btn = gr.Button("Submit", variant="primary")
+    status_box = gr.Textbox(label="Status")
+    results_table = gr.Dataframe(label="Top 10 Recommended Assessments", wrap=True)
+    results_state = gr.State()
+    export_btn = gr.Button("📥Export CSV")
+    export_file = gr.File(label="📥Download CSV")
+
+    submit_btn.click(recommend_for_ui, inputs=query_box, outputs=[status_box, results_table, results_state])
+    query_box.submit(recommend_for_ui, inputs=query_box, outputs=[status_box, results_table, results_state])
+    export_btn.click(export_csv, inputs=results_state, outputs=export_file, queue=False)
+
+# queue config applies both to `python app.py` and to the copy mounted in api.py
+demo.queue(default_concurrency_limit=QUEUE_CONCURRENCY, max_size=QUEUE_MAX_SIZE)
+
+if __name__ == "__main__":
+    demo.launch()
@@ -0,0 +1,374 @@
+"""
+In-process approximate-nearest-neighbour index (IVF over cosine similarity).
+
+Vectors are stored per catalog partition (e.g. "shl", a second vendor, or a
+client's custom library), so filtered search only ever touches the partitions
+it asks for. Small partitions are searched exactly; once a partition grows past
+`train_threshold` rows it is clustered with spherical k-means and searched by
+probing the `nprobe` closest inverted lists.
+
+The index supports incremental upserts/deletes, persists to a directory
+(one .npz + .json pair per partition), and exposes a Pinecone-compatible
+`query(...)` so it can stand in as the local backend for VectorStoreClient.
+
+Build from a CSV (from the repo root):
+    python -m core.ann_index --input shl_enhanced_assessments_with_tags.csv --catalog shl
+"""
+import os
+import json
+import argparse
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+ANN_INDEX_DIR = os.getenv("ANN_INDEX_DIR", os.path.join("catalog", "ann"))
+DEFAULT_CATALOG = "shl"
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, sorted descending."""
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx])]
+
+
+def _catalogs(namespace: Optional[str], filter: Optional[Dict]) -> Optional[List[str]]:
+    """Partitions selected by a Pinecone namespace or a {"catalog": ...} / {"catalog": {"$in": [...]}} filter."""
+    if filter and "catalog" in filter:
+        wanted = filter["catalog"]
+        if isinstance(wanted, dict):
+            return list(wanted.get("$in") or [wanted.get("$eq")])
+        return [wanted]
+    return [namespace] if namespace else None
+
+
+class _Partition:
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.vectors = np.empty((0, dim), dtype=np.float32)
+        self.size = 0
+        self.ids: List[str] = []
+        self.metadata: List[Dict] = []
+        self.alive = np.empty(0, dtype=bool)
+        self.row_of: Dict[str, int] = {}
+        self.centroids: Optional[np.ndarray] = None
+        self.assignment = np.empty(0, dtype=np.int32)
+        self.lists: List[np.ndarray] = []
+        self.trained_size = 0
+
+    @property
+    def count(self) -> int:
+        return len(self.row_of)
+
+    def _grow(self, extra: int):
+        needed = self.size + extra
+        if needed <= self.vectors.shape[0]:
+            return
+        capacity = max(needed, self.vectors.shape[0] * 2, 1024)
+        vectors = np.empty((capacity, self.dim), dtype=np.float32)
+        vectors[:self.size] = self.vectors[:self.size]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self.size] = self.alive[:self.size]
+        assignment = np.full(capacity, -1, dtype=np.int32)
+        assignment[:self.size] = self.assignment[:self.size]
+        self.vectors, self.alive, self.assignment = vectors, alive, assignment
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        return np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray, metadata: Sequence[Dict]):
+        self.delete([i for i in ids if i in self.row_of])
+        n = len(ids)
+        self._grow(n)
+        start, end = self.size, self.size + n
+        self.vectors[start:end] = vectors
+        self.alive[start:end] = True
+        self.ids.extend(ids)
+        self.metadata.extend(metadata)
+        for offset, aid in enumerate(ids):
+            self.row_of[aid] = start + offset
+        self.size = end
+
+        if self.centroids is not None:
+            assigned = self._assign(vectors)
+            self.assignment[start:end] = assigned
+            rows = np.arange(start, end)
+            for cluster in np.unique(assigned):
+                self.lists[cluster] = np.concatenate([self.lists[cluster], rows[assigned == cluster]])
+
+    def delete(self, ids: Iterable[str]):
+        for aid in ids:
+            row = self.row_of.pop(aid, None)
+            if row is not None:
+                self.alive[row] = False
+                self.metadata[row] = None
+
+    def update_metadata(self, aid: str, metadata: Dict):
+        row = self.row_of.get(aid)
+        if row is not None:
+            self.metadata[row] = metadata
+
+    def compact(self):
+        rows = np.flatnonzero(self.alive[:self.size])
+        self.vectors = self.vectors[rows].copy()
+        self.alive = np.ones(len(rows), dtype=bool)
+        self.ids = [self.ids[r] for r in rows]
+        self.metadata = [self.metadata[r] for r in rows]
+        self.row_of = {aid: i for i, aid in enumerate(self.ids)}
+        self.size = len(rows)
+        self.assignment = self.assignment[rows].copy()
+        if self.centroids is not None:
+            self._rebuild_lists()
+
+    def _rebuild_lists(self):
+        order = np.argsort(self.assignment[:self.size], kind="stable")
+        bounds = np.searchsorted(self.assignment[:self.size][order], np.arange(len(self.centroids) + 1))
+        self.lists = [order[bounds[c]:bounds[c + 1]] for c in range(len(self.centroids))]
+
+    def train(self, nlist: int, iterations: int = 15, sample_size: int = 256, seed: int = 0):
+        """Spherical k-means over (a sample of) the live vectors."""
+        live = self.vectors[:self.size][self.alive[:self.size]]
+        nlist = max(1, min(nlist, len(live)))
+        rng = np.random.default_rng(seed)
+        sample = live
+        if len(live) > nlist * sample_size:
+            sample = live[rng.choice(len(live), nlist * sample_size, replace=False)]
+
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            empty = np.bincount(labels, minlength=nlist) == 0
+            # re-seed empty clusters with random points so nlist stays useful
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            centroids = _normalize(sums)
+
+        self.centroids = centroids
+        self.assignment[:self.size] = self._assign(self.vectors[:self.size])
+        self._rebuild_lists()
+        self.trained_size = self.count
+
+    def search(self, queries: np.ndarray, top_k: int, nprobe: Optional[int]) -> List[List[Tuple[int, float]]]:
+        vectors = self.vectors[:self.size]
+        if self.centroids is None or nprobe is None:
+            scores = queries @ vectors.T
+            scores[:, ~self.alive[:self.size]] = -np.inf
+            results = []
+            for row_scores in scores:
+                idx = _top_k(row_scores, top_k)
+                results.append([(int(r), float(row_scores[r])) for r in idx if np.isfinite(row_scores[r])])
+            return results
+
+        probes = np.argsort(-(queries @ self.centroids.T), axis=1)[:, :nprobe]
+        results = []
+        for query, lists in zip(queries, probes):
+            candidates = np.concatenate([self.lists[c] for c in lists])
+            candidates = candidates[self.alive[candidates]]
+            scores = vectors[candidates] @ query
+            idx = _top_k(scores, top_k)
+            results.append([(int(candidates[i]), float(scores[i])) for i in idx])
+        return results
+
+
+class ANNIndex:
+    def __init__(
+        self,
+        dim: int = 384,
+        nprobe: int = int(os.getenv("ANN_NPROBE", "8")),
+        train_threshold: int = int(os.getenv("ANN_TRAIN_THRESHOLD", "10000")),
+        retrain_growth: float = 0.5,
+        compact_ratio: float = 0.3,
+    ):
+        self.dim = dim
+        self.nprobe = nprobe
+        self.train_threshold = train_threshold
+        self.retrain_growth = retrain_growth
+        self.compact_ratio = compact_ratio
+        self.partitions: Dict[str, _Partition] = {}
+
+    # --- maintenance ------------------------------------------------------
+
+    def _partition(self, catalog: str) -> _Partition:
+        if catalog not in self.partitions:
+            self.partitions[catalog] = _Partition(self.dim)
+        return self.partitions[catalog]
+
+    def _maintain(self, part: _Partition):
+        if part.size and (part.size - part.count) / part.size > self.compact_ratio:
+            part.compact()
+        if part.count < self.train_threshold:
+            part.centroids = None
+            return
+        if part.centroids is None or part.count > part.trained_size * (1 + self.retrain_growth):
+            part.train(nlist=int(4 * np.sqrt(part.count)))
+
+    def upsert(self, ids: Sequence[str], vectors, metadata: Optional[Sequence[Dict]] = None, catalog: str = DEFAULT_CATALOG):
+        if not len(ids):
+            return
+        part = self._partition(catalog)
+        part.add(list(ids), _normalize(vectors), list(metadata) if metadata is not None else [{} for _ in ids])
+        self._maintain(part)
+
+    def delete(self, ids: Sequence[str], catalog: Optional[str] = None):
+        if catalog:
+            parts = [self.partitions[catalog]] if catalog in self.partitions else []
+        else:
+            parts = list(self.partitions.values())
+        for part in parts:
+            part.delete(ids)
+            self._maintain(part)
+
+    def update_metadata(self, aid: str, metadata: Dict, catalog: str = DEFAULT_CATALOG):
+        if catalog in self.partitions:
+            self.partitions[catalog].update_metadata(aid, metadata)
+
+    def __len__(self) -> int:
+        return sum(p.count for p in self.partitions.values())
+
+    # --- search -----------------------------------------------------------
+
+    def search(
+        self,
+        queries,
+        top_k: int = 10,
+        catalogs: Optional[Sequence[str]] = None,
+        exact: bool = False,
+        nprobe: Optional[int] = None,
+    ) -> List[List[Dict]]:
+        """
+        Batched search. `queries` is (m, dim); returns one ranked list of
+        {"id", "score", "metadata", "catalog"} per query, merged across the
+        requested partitions.
+        """
+        queries = _normalize(queries)
+        names = list(catalogs) if catalogs else list(self.partitions)
+        merged: List[List[Dict]] = [[] for _ in range(len(queries))]
+
+        for name in names:
+            part = self.partitions.get(name)
+            if part is None or not part.count:
+                continue
+            probe = None if exact else (nprobe or self.nprobe)
+            for out, hits in zip(merged, part.search(queries, top_k, probe)):
+                out.extend(
+                    {"id": part.ids[row], "score": score, "metadata": part.metadata[row], "catalog": name}
+                    for row, score in hits
+                )
+
+        if len(names) > 1:
+            merged = [sorted(hits, key=lambda h: h["score"], reverse=True)[:top_k] for hits in merged]
+        return merged
+
+    def query(self, vector, top_k: int = 10, include_metadata: bool = True, namespace: Optional[str] = None, filter: Optional[Dict] = None, **_):
+        """Pinecone-compatible single-vector query used as the local fallback backend."""
+        hits = self.search([vector], top_k=top_k, catalogs=_catalogs(namespace, filter))[0]
+        return {
+            "matches": [
+                {"id": h["id"], "score": h["score"], "metadata": h["metadata"] if include_metadata else None}
+                for h in hits
+            ]
+        }
+
+    def query_batch(self, vectors, top_k: int = 10, include_metadata: bool = True, namespace: Optional[str] = None, filter: Optional[Dict] = None, **_):
+        """All queries scored in one matrix operation; returns one Pinecone-shaped response per vector."""
+        catalogs = _catalogs(namespace, filter)
+        return [
+            {
+                "matches": [
+                    {"id": h["id"], "score": h["score"], "metadata": h["metadata"] if include_metadata else None}
+                    for h in hits
+                ]
+            }
+            for hits in self.search(vectors, top_k=top_k, catalogs=catalogs)
+        ]
+
+    # --- persistence ------------------------------------------------------
+
+    def save(self, directory: str = ANN_INDEX_DIR):
+        os.makedirs(directory, exist_ok=True)
+        for name, part in self.partitions.items():
+            part.compact()
+            arrays = {"vectors": part.vectors[:part.size], "assignment": part.assignment[:part.size]}
+            if part.centroids is not None:
+                arrays["centroids"] = part.centroids
+            tmp_npz = os.path.join(directory, f".{name}.tmp.npz")
+            tmp_json = os.path.join(directory, f".{name}.tmp.json")
+            np.savez(tmp_npz, **arrays)
+            with open(tmp_json, "w", encoding="utf-8") as f:
+                json.dump({"ids": part.ids, "metadata": part.metadata, "trained_size": part.trained_size}, f, ensure_ascii=False)
+            os.replace(tmp_npz, os.path.join(directory, f"{name}.npz"))
+            os.replace(tmp_json, os.path.join(directory, f"{name}.json"))
+
+    @classmethod
+    def load(cls, directory: str = ANN_INDEX_DIR, **kwargs) -> "ANNIndex":
+        index = None
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith(".npz") or filename.startswith("."):
+                continue
+            name = filename[:-4]
+            arrays = np.load(os.path.join(directory, filename))
+            with open(os.path.join(directory, f"{name}.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            if index is None:
+                index = cls(dim=arrays["vectors"].shape[1], **kwargs)
+            part = index._partition(name)
+            part.vectors = arrays["vectors"].astype(np.float32)
+            part.size = len(part.vectors)
+            part.alive = np.ones(part.size, dtype=bool)
+            part.assignment = arrays["assignment"].astype(np.int32)
+            part.ids = meta["ids"]
+            part.metadata = meta["metadata"]
+            part.row_of = {aid: i for i, aid in enumerate(part.ids)}
+            part.trained_size = meta.get("trained_size", 0)
+            if "centroids" in arrays:
+                part.centroids = arrays["centroids"]
+                part._rebuild_lists()
+        return index or cls(**kwargs)
+
+
+def load_local_index(directory: str = ANN_INDEX_DIR) -> Optional[ANNIndex]:
+    if not os.path.isdir(directory):
+        return None
+    try:
+        index = ANNIndex.load(directory)
+        print(f" Loaded local ANN index ({len(index)} vectors, partitions: {list(index.partitions)})")
+        return index
+    except Exception as e:
+        print(f" Could not load local ANN index: {e}")
+        return None
+
+
+def main():
+    import pandas as pd
+    from sentence_transformers import SentenceTransformer
+    from core.catalog_refresh import load_catalog, build_metadata, embedding_text
+
+    parser = argparse.ArgumentParser(description="Build or extend the local ANN index from a catalog CSV.")
+    parser.add_argument("--input", required=True, help="Catalog CSV (same columns as the SHL catalog)")
+    parser.add_argument("--catalog", default=DEFAULT_CATALOG, help="Partition name for these rows")
+    parser.add_argument("--out", default=ANN_INDEX_DIR)
+    args = parser.parse_args()
+
+    index = ANNIndex.load(args.out) if os.path.isdir(args.out) else ANNIndex()
+    records = load_catalog(pd.read_csv(args.input).to_dict("records"))
+    ids = list(records)
+    model = SentenceTransformer("all-MiniLM-L6-v2")
+    embeddings = model.encode([embedding_text(records[aid]) for aid in ids], batch_size=64, show_progress_bar=True)
+    index.upsert(ids, embeddings, [build_metadata(records[aid], args.catalog) for aid in ids], catalog=args.catalog)
+    index.save(args.out)
+    print(f" Saved {len(ids)} vectors to partition '{args.catalog}' in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Shared catalog-record layer used by retrieval, the API and the Gradio app.
+
+Every assessment is turned into a CatalogRecord once per catalog version:
+the test-type letters are decoded, the rerank prompt block is rendered, and
+the API / UI payloads (plus the API payload's JSON bytes) are built up front.
+Per-request code then only looks records up by ID.
+"""
+import os
+import time
+import threading
+from typing import Dict, List, Optional
+import orjson
+from core.query_facets import build_vocabulary
+from core.catalog_refresh import CATALOG_DIR, assessment_id, current_pointer_path, list_catalogs, load_catalog_snapshot
+
+TEST_TYPE_MAP = {
+    "A": "Ability & Aptitude",
+    "B": "Biodata & Situational Judgement",
+    "C": "Competencies",
+    "D": "Development & 360",
+    "E": "Assessment Exercises",
+    "K": "Knowledge & Skills",
+    "P": "Personality & Behavior",
+    "S": "Simulations"
+}
+
+
+def decode_test_type(code: str) -> str:
+    return ", ".join(TEST_TYPE_MAP.get(c.strip(), c) for c in code if c.strip() in TEST_TYPE_MAP)
+
+
+class CatalogRecord:
+    __slots__ = ("id", "name", "link", "test_type", "rerank_block", "result", "api_payload", "api_json", "ui_row")
+
+    def __init__(self, aid: str, md: Dict):
+        name = str(md.get("Test Name", "") or "")
+        link = str(md.get("Test Link", "") or "")
+        description = str(md.get("Description", "") or "")
+        duration = str(md.get("Assessment Length", "") or "")
+        remote = md.get("Remote Testing") or "No"
+        adaptive = md.get("Adaptive/IRT") or "No"
+        code = str(md.get("Test Type", "") or "")
+        test_type = decode_test_type(code)
+        tags = md.get("Tags", [])
+        tags = ", ".join(tags) if isinstance(tags, list) else str(tags or "")
+
+        self.id = aid
+        self.name = name
+        self.link = link
+        self.test_type = test_type
+        # numbered per request by prefixing "{n}. "
+        self.rerank_block = f"""Title: {name}
+    Description: {description}
+    Tags: {tags}
+    Job Level: {md.get('Job Levels', '')}
+    Duration: {duration}
+    Test Type: {test_type}
+    """
+        self.result = {
+            "id": aid,
+            "Test Name": name,
+            "Test Link": link,
+            "Description": description,
+            "Assessment Length": duration,
+            "Remote Support": remote,
+            "Adaptive Support": adaptive,
+            "Test Type": code,
+        }
+        self.api_payload = {
+            "Test_Name": name,
+            "URL": link,
+            "Description": description,
+            "Duration": duration,
+            "Remote_Support": remote,
+            "Adaptive_Support": adaptive,
+            "Test_Type": test_type,
+        }
+        self.api_json = orjson.dumps(self.api_payload)
+        self.ui_row = {
+            "Test Name": name,
+            "URL": link,
+            "Description": description,
+            "Duration": duration,
+            "Remote Support": remote,
+            "Adaptive Support": adaptive,
+            "Test Type": test_type,
+        }
+
+
+class CatalogStore:
+    """
+    Records for the published version of every catalog, keyed by assessment ID.
+
+    A daemon thread re-checks the per-catalog CURRENT pointers written by
+    core.catalog_refresh every `check_interval` seconds; when any of them
+    moves, the records are rebuilt off to the side and swapped in whole, so
+    request paths (including the event loop) only ever read. `version`
+    names the combination, e.g. "shl@4+vendor2@1". Matches whose ID is not in the snapshot (e.g. vectors
+    indexed before stable IDs) are built from their metadata on first sight
+    and memoized.
+    """
+
+    def __init__(self, catalog_dir: str = CATALOG_DIR, check_interval: float = 30.0):
+        self.catalog_dir = catalog_dir
+        self.check_interval = check_interval
+        self.version: Optional[str] = None
+        self._records: Dict[str, CatalogRecord] = {}
+        # tags + test names of the loaded catalogs, used to validate query facets
+        self.skill_vocabulary = set()
+        self._pointer_mtimes: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        # serializes check-and-rebuild between the watcher and explicit reload() calls
+        self._reload_lock = threading.Lock()
+        self.reload()
+        self._watcher = threading.Thread(target=self._watch, name="catalog-watcher", daemon=True)
+        self._watcher.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.check_interval)
+            try:
+                self.reload()
+            except Exception as e:
+                print(f" Catalog reload failed, keeping version {self.version}: {e}")
+
+    def reload(self):
+        """Rebuild the records if any CURRENT pointer moved (blocking; not for request paths)."""
+        with self._reload_lock:
+            mtimes = {}
+            for name in list_catalogs(self.catalog_dir):
+                try:
+                    mtimes[name] = os.path.getmtime(current_pointer_path(name, self.catalog_dir))
+                except (OSError, TypeError):
+                    continue
+            if not mtimes or mtimes == self._pointer_mtimes:
+                return
+
+            records = {}
+            versions = []
+            vocabulary = set()
+            for name in sorted(mtimes):
+                snapshot = load_catalog_snapshot(name, self.catalog_dir)
+                versions.append(f"{name}@{snapshot['version']}")
+                records.update((aid, CatalogRecord(aid, md)) for aid, md in snapshot["records"].items())
+                mds = snapshot["records"].values()
+                vocabulary |= build_vocabulary((md.get("Tags", []) for md in mds), (md.get("Test Name", "") for md in mds))
+            with self._lock:
+                self._records = records
+                self.skill_vocabulary = vocabulary
+                self.version = "+".join(versions)
+                self._pointer_mtimes = mtimes
+            print(f" Loaded catalog version {self.version} ({len(records)} records)")
+
+    def resolve(self, match_id: str, metadata: Optional[Dict] = None) -> Optional[CatalogRecord]:
+        record = self._records.get(match_id)
+        if record is not None or metadata is None:
+            return record
+
+        stable_id = assessment_id(str(metadata.get("Test Link", "")))
+        record = self._records.get(stable_id) or CatalogRecord(stable_id, metadata)
+        with self._lock:
+            self._records[match_id] = record
+            self._records.setdefault(stable_id, record)
+        return record
+
+    def current_version(self) -> Optional[str]:
+        """Version of the loaded catalogs; key caches with it. Never blocks on a reload."""
+        return self.version
+
+    def get(self, aid: str) -> Optional[CatalogRecord]:
+        return self._records.get(aid)
+
+    def api_json(self, ids: List[str]) -> Optional[bytes]:
+        """Pre-encoded JSON array of API payloads for the given IDs, or None if none resolve."""
+        records = self._records
+        payloads = [records[aid].api_json for aid in ids if aid in records]
+        if not payloads:
+            return None
+        return b"[" + b",".join(payloads) + b"]"
+
+    def ui_rows(self, ids: List[str]) -> List[Dict]:
+        records = self._records
+        return [records[aid].ui_row for aid in ids if aid in records]
+
+
+catalog_store = CatalogStore()
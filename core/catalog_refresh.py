@@ -0,0 +1,403 @@
+"""
+Incremental catalog refresh: scrape -> tag -> embed only what changed.
+
+Each assessment gets a stable ID derived from its Test Link and a hash of its
+content fields. The fresh catalog is diffed against the last published
+snapshot so that only new/changed rows are re-tagged (Gemini) and re-embedded
+(Pinecone), removed rows are deleted from the index, and the new snapshot is
+published atomically as the next catalog version.
+
+Each catalog (the SHL catalog, another vendor, a client's custom library) has
+its own snapshot history under catalog/<name>/, so refreshing one catalog
+never treats another catalog's rows as removed. Vectors carry a "catalog"
+metadata field so Pinecone queries can be filtered the same way the local
+ANN index selects partitions; vectors indexed before that field existed get
+it backfilled as metadata-only updates on the next refresh.
+
+Usage (from the repo root):
+    python -m core.catalog_refresh                      # scrape the live catalog
+    python -m core.catalog_refresh --input shl_enhanced_assessments_clean.csv
+    python -m core.catalog_refresh --rebuild            # re-embed every row
+    python -m core.catalog_refresh --catalog vendor2 --input vendor2.csv
+
+A refresh that would remove more than CATALOG_MAX_REMOVED_FRACTION of the
+catalog (usually a partially failed scrape) aborts unless --allow-removals is
+passed.
+
+The first run (no published snapshot) also deletes the legacy uuid4 vectors
+written by the old ingest, so stable-ID vectors never sit next to duplicates.
+"""
+import os
+import re
+import ast
+import json
+import time
+import hashlib
+import argparse
+import tempfile
+from typing import Dict, List, Optional
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CATALOG_DIR = os.getenv("CATALOG_DIR", "catalog")
+CURRENT_POINTER = "CURRENT"
+DEFAULT_CATALOG = "shl"
+
+CONTENT_FIELDS = [
+    "Test Name",
+    "Test Link",
+    "Remote Testing",
+    "Adaptive/IRT",
+    "Test Type",
+    "Description",
+    "Job Levels",
+    "Assessment Length",
+]
+# Fields that feed the tagging prompt and the embedding text
+SEMANTIC_FIELDS = ["Test Name", "Description"]
+
+BATCH_SIZE = 25
+# Refuse to publish a diff that removes more than this share of the catalog
+# unless --allow-removals is given (a failed listing page drops whole pages)
+MAX_REMOVED_FRACTION = float(os.getenv("CATALOG_MAX_REMOVED_FRACTION", "0.1"))
+STABLE_ID_RE = re.compile(r"[0-9a-f]{40}")
+# Published snapshot files kept per catalog (older ones are pruned on publish)
+KEEP_SNAPSHOTS = int(os.getenv("CATALOG_KEEP_SNAPSHOTS", "5"))
+_SNAPSHOT_RE = re.compile(r"catalog_v(\d+)\.json")
+
+
+def assessment_id(test_link: str) -> str:
+    normalized = test_link.strip().lower().rstrip("/")
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def _hash_fields(record: Dict, fields: List[str]) -> str:
+    payload = json.dumps([str(record.get(f, "")) for f in fields], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def content_hash(record: Dict) -> str:
+    return _hash_fields(record, CONTENT_FIELDS)
+
+
+def semantic_hash(record: Dict) -> str:
+    return _hash_fields(record, SEMANTIC_FIELDS)
+
+
+def embedding_text(record: Dict) -> str:
+    return f"{record['Test Name']}. {record['Description']}"
+
+
+def parse_tags(tag_value):
+    try:
+        tags = ast.literal_eval(tag_value) if isinstance(tag_value, str) else tag_value
+        return tags if isinstance(tags, list) else []
+    except Exception:
+        return []
+
+
+def build_metadata(record: Dict, catalog: str = DEFAULT_CATALOG) -> Dict:
+    metadata = {field: str(record.get(field, "")) for field in CONTENT_FIELDS}
+    metadata["Tags"] = list(record.get("Tags", []))
+    # lets Pinecone filter by catalog the way the local index picks partitions
+    metadata["catalog"] = catalog
+    return metadata
+
+
+# --- snapshots -------------------------------------------------------------
+
+def _snapshot_path(version: int, catalog_dir: str = CATALOG_DIR) -> str:
+    return os.path.join(catalog_dir, f"catalog_v{version}.json")
+
+
+def _atomic_write(path: str, text: str):
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_current_snapshot(catalog_dir: str = CATALOG_DIR) -> Optional[Dict]:
+    pointer = os.path.join(catalog_dir, CURRENT_POINTER)
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer, encoding="utf-8") as f:
+        version = int(f.read().strip())
+    with open(_snapshot_path(version, catalog_dir), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def catalog_path(catalog: str, root: str = CATALOG_DIR) -> str:
+    return os.path.join(root, catalog)
+
+
+def current_pointer_path(catalog: str, root: str = CATALOG_DIR) -> Optional[str]:
+    pointer = os.path.join(catalog_path(catalog, root), CURRENT_POINTER)
+    if os.path.exists(pointer):
+        return pointer
+    # layout before per-catalog directories: a single catalog/CURRENT for SHL
+    legacy = os.path.join(root, CURRENT_POINTER)
+    if catalog == DEFAULT_CATALOG and os.path.exists(legacy):
+        return legacy
+    return None
+
+
+def load_catalog_snapshot(catalog: str, root: str = CATALOG_DIR) -> Optional[Dict]:
+    pointer = current_pointer_path(catalog, root)
+    return load_current_snapshot(os.path.dirname(pointer)) if pointer else None
+
+
+def list_catalogs(root: str = CATALOG_DIR) -> List[str]:
+    if not os.path.isdir(root):
+        return []
+    names = [d for d in os.listdir(root) if os.path.exists(os.path.join(root, d, CURRENT_POINTER))]
+    if DEFAULT_CATALOG not in names and current_pointer_path(DEFAULT_CATALOG, root):
+        names.append(DEFAULT_CATALOG)
+    return sorted(names)
+
+
+def publish_snapshot(records: Dict[str, Dict], previous: Optional[Dict], catalog_dir: str = CATALOG_DIR) -> int:
+    """Write the snapshot file first, then flip the CURRENT pointer with an atomic rename."""
+    os.makedirs(catalog_dir, exist_ok=True)
+    version = (previous["version"] + 1) if previous else 1
+    snapshot = {
+        "version": version,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "records": records,
+    }
+    _atomic_write(_snapshot_path(version, catalog_dir), json.dumps(snapshot, ensure_ascii=False))
+    _atomic_write(os.path.join(catalog_dir, CURRENT_POINTER), str(version))
+    prune_snapshots(version, catalog_dir)
+    return version
+
+
+def prune_snapshots(current_version: int, catalog_dir: str = CATALOG_DIR, keep: int = KEEP_SNAPSHOTS):
+    """Delete snapshot files older than the last `keep` versions."""
+    for filename in os.listdir(catalog_dir):
+        match = _SNAPSHOT_RE.fullmatch(filename)
+        if match and int(match.group(1)) <= current_version - max(1, keep):
+            os.remove(os.path.join(catalog_dir, filename))
+
+
+# --- diffing ---------------------------------------------------------------
+
+def load_catalog(rows: List[Dict], previous: Optional[Dict[str, Dict]] = None) -> Dict[str, Dict]:
+    """
+    Normalize scraped/CSV rows into {id: record}, dropping duplicates and empty
+    descriptions. The scraper returns "" for a detail page it failed to fetch,
+    so a known assessment that comes back without a description keeps its
+    record from `previous` instead of being treated as removed.
+    """
+    previous = previous or {}
+    records = {}
+    for row in rows:
+        record = {field: "" if pd.isna(row.get(field, "")) else str(row.get(field, "")).strip() for field in CONTENT_FIELDS}
+        if not record["Test Link"]:
+            continue
+        aid = assessment_id(record["Test Link"])
+        if aid in records:
+            continue
+        if not record["Description"]:
+            if aid in previous:
+                print(f" No description for '{record['Test Name']}', keeping the previous record")
+                records[aid] = dict(previous[aid])
+            continue
+        record["id"] = aid
+        record["hash"] = content_hash(record)
+        record["semantic_hash"] = semantic_hash(record)
+        if "Tags" in row:
+            record["Tags"] = parse_tags(row["Tags"])
+        records[aid] = record
+    return records
+
+
+def diff_catalog(current: Dict[str, Dict], previous: Dict[str, Dict]) -> Dict[str, List[str]]:
+    added, changed, unchanged = [], [], []
+    for aid, record in current.items():
+        old = previous.get(aid)
+        if old is None:
+            added.append(aid)
+        elif old["hash"] != record["hash"]:
+            changed.append(aid)
+        else:
+            unchanged.append(aid)
+    removed = [aid for aid in previous if aid not in current]
+    return {"added": added, "changed": changed, "removed": removed, "unchanged": unchanged}
+
+
+# --- pipeline --------------------------------------------------------------
+
+def legacy_vector_ids(index) -> List[str]:
+    """IDs in the remote index that are not stable assessment IDs (uuid4 vectors from the old ingest)."""
+    legacy, token = [], None
+    while True:
+        page = index.list_paginated(limit=100, pagination_token=token)
+        legacy.extend(v.id for v in page.vectors if not STABLE_ID_RE.fullmatch(v.id))
+        token = page.pagination.next if page.pagination else None
+        if not token:
+            return legacy
+
+
+def refresh(
+    rows: List[Dict],
+    rebuild: bool = False,
+    dry_run: bool = False,
+    catalog_dir: str = CATALOG_DIR,
+    catalog: str = DEFAULT_CATALOG,
+    allow_removals: bool = False,
+) -> Dict:
+    # diff only against this catalog's own history
+    snapshot = load_catalog_snapshot(catalog, catalog_dir)
+    previous = snapshot["records"] if snapshot else {}
+    current = load_catalog(rows, previous)
+
+    changes = diff_catalog(current, previous)
+    print(
+        f" Catalog diff: {len(changes['added'])} added, {len(changes['changed'])} changed, "
+        f"{len(changes['removed'])} removed, {len(changes['unchanged'])} unchanged"
+    )
+
+    removed_fraction = len(changes["removed"]) / len(previous) if previous else 0.0
+    if removed_fraction > MAX_REMOVED_FRACTION and not allow_removals:
+        message = (
+            f"{len(changes['removed'])} of {len(previous)} assessments ({removed_fraction:.0%}) would be removed, "
+            f"above the {MAX_REMOVED_FRACTION:.0%} limit; check the scrape or pass --allow-removals"
+        )
+        if dry_run:
+            print(f" {message}")
+            return changes
+        raise RuntimeError(message)
+
+    to_index = changes["added"] + changes["changed"]
+    needs_embedding = []
+    needs_metadata_only = []
+    needs_tags = []
+
+    for aid in to_index:
+        record = current[aid]
+        old = previous.get(aid)
+        if old is None:
+            # new row: tags from the input CSV are fine, otherwise ask the LLM
+            if not record.get("Tags"):
+                needs_tags.append(aid)
+            needs_embedding.append(aid)
+        elif old.get("semantic_hash") != record["semantic_hash"]:
+            # name/description changed, so any tags carried in the input are stale
+            needs_tags.append(aid)
+            needs_embedding.append(aid)
+        else:
+            record["Tags"] = old.get("Tags", [])
+            (needs_embedding if rebuild else needs_metadata_only).append(aid)
+
+    for aid in changes["unchanged"]:
+        current[aid]["Tags"] = previous[aid].get("Tags", [])
+        if rebuild:
+            needs_embedding.append(aid)
+        elif previous[aid].get("catalog") != catalog:
+            # indexed before vectors carried a "catalog" field: backfill it
+            needs_metadata_only.append(aid)
+    for record in current.values():
+        record["catalog"] = catalog
+
+    print(f" LLM tagging: {len(needs_tags)} | embeddings: {len(needs_embedding)} | metadata-only: {len(needs_metadata_only)}")
+    if dry_run:
+        return changes
+
+    from core.ann_index import ANN_INDEX_DIR
+    has_local_partition = os.path.exists(os.path.join(ANN_INDEX_DIR, f"{catalog}.npz"))
+    if snapshot is not None and not (needs_embedding or needs_metadata_only or changes["removed"]) and has_local_partition:
+        # publishing would bump the version and invalidate every cached result
+        print(f" Nothing changed; '{catalog}' stays at version {snapshot['version']}")
+        changes["version"] = snapshot["version"]
+        return changes
+
+    if needs_tags:
+        from core.data_enhance import extract_tags
+        for aid in needs_tags:
+            record = current[aid]
+            record["Tags"] = extract_tags(record["Test Name"], record["Description"])
+
+    from core.retrieval import vector_client as index, model
+    from core.ann_index import ANNIndex, load_local_index
+
+    local_index = load_local_index() or ANNIndex()
+
+    # The local index must mirror the whole catalog, not just this run's diff:
+    # if its partition is missing (first run, or catalog/ann was lost), embed
+    # every current row for it while only sending the diff to Pinecone.
+    local_rebuild = rebuild or catalog not in local_index.partitions
+    if local_rebuild:
+        local_index.partitions.pop(catalog, None)
+    remote_ids = set(needs_embedding)
+    embed_ids = list(current) if local_rebuild else needs_embedding
+
+    for start in range(0, len(embed_ids), BATCH_SIZE):
+        batch_ids = embed_ids[start:start + BATCH_SIZE]
+        texts = [embedding_text(current[aid]) for aid in batch_ids]
+        embeddings = model.encode(texts, batch_size=BATCH_SIZE)
+        vectors = [
+            (aid, embedding.tolist(), build_metadata(current[aid], catalog))
+            for aid, embedding in zip(batch_ids, embeddings)
+        ]
+        remote_vectors = [v for v in vectors if v[0] in remote_ids]
+        if remote_vectors:
+            print(f"🔼 Upserting {len(remote_vectors)} vectors")
+            index.upsert(vectors=remote_vectors)
+        local_index.upsert(batch_ids, embeddings, [v[2] for v in vectors], catalog=catalog)
+
+    # only once the stable-ID vectors are in, so the live index never goes empty
+    if snapshot is None or rebuild:
+        legacy = legacy_vector_ids(index)
+        print(f" Removing {len(legacy)} legacy uuid4 vectors")
+        for start in range(0, len(legacy), BATCH_SIZE):
+            index.delete(ids=legacy[start:start + BATCH_SIZE])
+
+    for aid in needs_metadata_only:
+        metadata = build_metadata(current[aid], catalog)
+        index.update(id=aid, set_metadata=metadata)
+        local_index.update_metadata(aid, metadata, catalog=catalog)
+
+    removed = changes["removed"]
+    for start in range(0, len(removed), BATCH_SIZE):
+        batch_ids = removed[start:start + BATCH_SIZE]
+        print(f"🗑️ Deleting {len(batch_ids)} removed vectors")
+        index.delete(ids=batch_ids)
+    local_index.delete(removed, catalog=catalog)
+
+    local_index.save(ANN_INDEX_DIR)
+    version = publish_snapshot(current, snapshot, catalog_path(catalog, catalog_dir))
+    print(f" Published '{catalog}' catalog version {version} ({len(current)} assessments)")
+    changes["version"] = version
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally refresh the SHL catalog index.")
+    parser.add_argument("--input", help="CSV to refresh from instead of scraping the live catalog")
+    parser.add_argument("--rebuild", action="store_true", help="Re-embed every row and drop legacy uuid4 vectors (tags are reused)")
+    parser.add_argument("--catalog", default=DEFAULT_CATALOG, help="Catalog these rows belong to (snapshot history and ANN partition)")
+    parser.add_argument("--allow-removals", action="store_true", help="Publish even if more than CATALOG_MAX_REMOVED_FRACTION of the catalog is removed")
+    parser.add_argument("--dry-run", action="store_true", help="Only print the diff")
+    args = parser.parse_args()
+
+    if args.input:
+        rows = pd.read_csv(args.input).to_dict("records")
+    else:
+        from data_fetch import Scraper
+        rows = Scraper().scrape_all_tables(max_pages=100, max_results=None)
+
+    refresh(rows, rebuild=args.rebuild, dry_run=args.dry_run, catalog=args.catalog, allow_removals=args.allow_removals)
+
+
+if __name__ == "__main__":
+    main()
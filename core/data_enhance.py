@@ -7,7 +7,6 @@ from dotenv import load_dotenv
 from tqdm import tqdm
 
 load_dotenv()
-df = pd.read_csv("shl_enhanced_assessments_clean.csv")
 
 api_key = os.getenv("GEMINI_API_KEY")
 genai.configure(api_key=api_key)
@@ -41,12 +40,7 @@ Title: "{title}"
 Description: "{description}"
 """
 
-tag_column = []
-
-for _, row in tqdm(df.iterrows(), total=len(df)):
-    title = str(row.get("Test Name", ""))
-    description = str(row.get("Description", ""))
-
+def extract_tags(title: str, description: str) -> list:
     prompt = generate_prompt(title, description)
 
     try:
@@ -58,9 +52,19 @@ for _, row in tqdm(df.iterrows(), total=len(df)):
         response_text = response_text.strip()
 
         parsed = json.loads(response_text)
-        tags = parsed.get("tags", [])
+        return parsed.get("tags", [])
     except Exception as e:
-        tags = []
         print(f"Error on '{title}': {e}")
+        return []
+
+if __name__ == "__main__":
+    df = pd.read_csv("shl_enhanced_assessments_clean.csv")
+    tag_column = []
+
+    for _, row in tqdm(df.iterrows(), total=len(df)):
+        title = str(row.get("Test Name", ""))
+        description = str(row.get("Description", ""))
+        tag_column.append(extract_tags(title, description))
 
-    tag_column.append(tags)
\ No newline at end of file
+    df["Tags"] = tag_column
+    df.to_csv("shl_enhanced_assessments_with_tags.csv", index=False)
@@ -0,0 +1,48 @@
+import os
+import time
+import atexit
+import shutil
+import tempfile
+import threading
+from collections import deque
+
+
+class TempFileManager:
+    """
+    Owns the CSV export files handed to the UI.
+
+    Files live in one private directory and are evicted once there are more
+    than `max_files` of them or they are older than `max_age` seconds; the
+    whole directory is removed at interpreter exit.
+    """
+
+    def __init__(self, max_files: int = 100, max_age: float = 900.0, prefix: str = "shl-exports-"):
+        self.max_files = max_files
+        self.max_age = max_age
+        self.directory = tempfile.mkdtemp(prefix=prefix)
+        self._files = deque()
+        self._lock = threading.Lock()
+        atexit.register(self.cleanup)
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._files and (len(self._files) > self.max_files or now - self._files[0][0] > self.max_age):
+            _, path = self._files.popleft()
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def write(self, data: bytes, suffix: str = ".csv", name: str = "recommendations") -> str:
+        fd, path = tempfile.mkstemp(dir=self.directory, prefix=f"{name}-", suffix=suffix)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        with self._lock:
+            self._files.append((time.monotonic(), path))
+            self._evict()
+        return path
+
+    def cleanup(self):
+        with self._lock:
+            self._files.clear()
+        shutil.rmtree(self.directory, ignore_errors=True)
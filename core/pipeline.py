@@ -0,0 +1,97 @@
+"""
+Async recommendation pipeline shared by the FastAPI service and the Gradio app.
+
+The blocking steps (JD scraping / Gemini preprocessing, vector search and
+Gemini rerank) run on a bounded thread pool. Results are kept in a TTL'd LRU
+cache keyed by the catalog version and the normalized user input (so a newly
+published catalog never serves IDs from the previous one), and concurrent
+requests for the same input share one in-flight computation, so both front
+ends reuse each other's work.
+"""
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from core.llm_processor import preprocess_input
+from core.retrieval import retrieve_and_rerank
+from core.catalog_records import catalog_store
+
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "8"))
+CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "256"))
+CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "3600"))
+
+_executor = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix="pipeline")
+
+
+class ResultCache:
+    def __init__(self, max_size: int = CACHE_SIZE, ttl: float = CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, List[Dict]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: List[Dict]):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+
+result_cache = ResultCache()
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def _normalize(user_input: str) -> str:
+    return " ".join(user_input.split())
+
+
+def _run_pipeline(user_input: str) -> List[Dict]:
+    refined_query = preprocess_input(user_input)
+    print(" Refined:", refined_query)
+    return retrieve_and_rerank(refined_query)
+
+
+def _compute(key: str, user_input: str) -> List[Dict]:
+    try:
+        results = _run_pipeline(user_input)
+        # empty results are usually a transient LLM failure — don't pin them
+        if results:
+            result_cache.set(key, results)
+        return results
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+async def recommend(user_input: str) -> List[Dict]:
+    key = f"{catalog_store.current_version()}|{_normalize(user_input)}"
+    cached = result_cache.get(key)
+    if cached is not None:
+        return cached
+
+    # concurrent.futures.Future (not asyncio) so callers on different event
+    # loops — e.g. Gradio and FastAPI mounted in one process — can share it
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is None:
+            future = _executor.submit(_compute, key, user_input)
+            _inflight[key] = future
+
+    return await asyncio.wrap_future(future)
@@ -0,0 +1,136 @@
+"""
+Multi-skill query decomposition.
+
+A query such as "proficient in Python, SQL and Java Script ... within 60
+minutes" is split into facet sub-queries ("Python", "SQL", "Java Script")
+that are searched alongside the full query, and the per-facet candidate lists
+are merged with a quota per facet so no single skill crowds out the others.
+
+List items only become facets when they match the catalog's skill vocabulary
+(assessment tags and test names), so "Research and Development role in Mumbai
+and Bangalore" is left alone while "python, sql and javascript" is split.
+"""
+import os
+import re
+import ast
+import csv
+import math
+from typing import Dict, Iterable, List, Optional, Set
+
+# a list-item token: "Python", "C++", "C#", "Node.js", "ASP.NET", "3D"
+_TOKEN = r"[A-Za-z0-9+#]+(?:[./-][A-Za-z0-9+#]+)*"
+_ITEM = rf"{_TOKEN}(?:\s+{_TOKEN})?"
+_LIST_RE = re.compile(rf"(?P<list>{_ITEM}(?:\s*,\s*{_ITEM})*\s*,?\s+(?:and|or|&)\s+{_ITEM})")
+
+_DURATION_RE = re.compile(
+    r"(?:(?:with\s+)?(?:a\s+)?(?:max(?:imum)?|within|under|less than|up to|in|of|completed in)\s+(?:duration\s+of\s+)?)?"
+    r"\d+\s*(?:-\s*\d+\s*)?(?:min(?:ute)?s?|hours?|hrs?)\b",
+    re.IGNORECASE,
+)
+
+
+def skill_key(term: str) -> str:
+    """Matching key: "Java Script", "javascript" and "JavaScript" all map to "javascript"."""
+    return re.sub(r"[^a-z0-9+#]", "", term.lower())
+
+
+def build_vocabulary(tag_lists: Iterable[Iterable[str]], names: Iterable[str] = ()) -> Set[str]:
+    vocabulary = set()
+    for tags in tag_lists:
+        vocabulary.update(skill_key(t) for t in tags if isinstance(t, str))
+    for name in names:
+        # "Core Java (Advanced Level) (New)" -> "Core Java"
+        vocabulary.add(skill_key(re.sub(r"\(.*?\)", "", str(name))))
+    vocabulary.discard("")
+    return vocabulary
+
+
+def vocabulary_from_csv(path: str) -> Set[str]:
+    """Vocabulary from a tagged catalog CSV (used when no snapshot has been published)."""
+    if not os.path.exists(path):
+        return set()
+    tag_lists, names = [], []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            names.append(row.get("Test Name", ""))
+            try:
+                tags = ast.literal_eval(row.get("Tags") or "[]")
+            except (ValueError, SyntaxError):
+                tags = []
+            tag_lists.append(tags if isinstance(tags, list) else [])
+    return build_vocabulary(tag_lists, names)
+
+
+def _match_skill(item: str, vocabulary: Set[str]) -> Optional[str]:
+    # items are at most two words: try the whole item, then each word
+    # ("in python" -> "python", "C# devs" -> "C#")
+    words = [w.strip(",.;:") for w in item.split()]
+    for span in [" ".join(words)] + words:
+        if span and skill_key(span) in vocabulary:
+            return span
+    return None
+
+
+def strip_duration(query: str) -> str:
+    return " ".join(_DURATION_RE.sub(" ", query).split())
+
+
+def decompose_query(query: str, vocabulary: Set[str], max_facets: int = 6) -> List[str]:
+    """
+    Return the skill facets found in `query` (empty if it is not a multi-skill
+    query). A list only counts when every item in it is a known skill.
+    """
+    facets: List[str] = []
+    for match in _LIST_RE.finditer(strip_duration(query)):
+        parts = re.split(r"\s*,\s*|\s+(?:and|or|&)\s+", match.group("list"))
+        items = [_match_skill(p, vocabulary) for p in parts]
+        if len(items) < 2 or not all(items):
+            continue
+        for item in items:
+            if skill_key(item) not in (skill_key(f) for f in facets):
+                facets.append(item)
+    return facets[:max_facets]
+
+
+def merge_facet_results(facet_matches: List[List[Dict]], budget: int) -> List[Dict]:
+    """
+    Merge ranked match lists (index 0 is the full query, the rest are facets).
+
+    Each list gets an equal quota of unique candidates, taken round-robin so
+    every facet is represented near the top; any budget left over (from
+    short or overlapping lists) is filled by score.
+    """
+    quota = math.ceil(budget / max(1, len(facet_matches)))
+    seen = set()
+    merged: List[Dict] = []
+    taken = [0] * len(facet_matches)
+    cursors = [0] * len(facet_matches)
+
+    progress = True
+    while len(merged) < budget and progress:
+        progress = False
+        for f, matches in enumerate(facet_matches):
+            if taken[f] >= quota:
+                continue
+            while cursors[f] < len(matches):
+                match = matches[cursors[f]]
+                cursors[f] += 1
+                if match["id"] not in seen:
+                    seen.add(match["id"])
+                    merged.append(match)
+                    taken[f] += 1
+                    progress = True
+                    break
+            if len(merged) >= budget:
+                break
+
+    if len(merged) < budget:
+        leftovers = [m for matches in facet_matches for m in matches if m["id"] not in seen]
+        for match in sorted(leftovers, key=lambda m: m["score"], reverse=True):
+            if match["id"] in seen:
+                continue
+            seen.add(match["id"])
+            merged.append(match)
+            if len(merged) >= budget:
+                break
+    return merged
@@ -1,9 +1,12 @@
 import os
 import re
-import time
+import math
 import json
-from typing import List, Dict, Tuple
-from pinecone import Pinecone
+from typing import List, Dict, Optional, Sequence, Tuple
+from core.vector_client import VectorStoreClient
+from core.ann_index import load_local_index
+from core.query_facets import decompose_query, merge_facet_results, vocabulary_from_csv
+from core.catalog_records import catalog_store
 from sentence_transformers import SentenceTransformer
 import google.generativeai as genai
 from dotenv import load_dotenv
@@ -12,41 +15,21 @@ load_dotenv()
 genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 llm = genai.GenerativeModel("gemini-2.0-flash")
 
-# pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-def get_index():
-    try:
-        pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-        return pc.Index("shl")
-    except Exception as e:
-        print(f" Pinecone init failed: {e}")
-        print("⏳ Retrying in 3s...")
-        time.sleep(3)
-        try:
-            pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-            return pc.Index("shl")
-        except Exception as inner_e:
-            print(f"Retry failed: {inner_e}")
-            raise inner_e
-        
-
-index = get_index()
+# Local ANN index (built by core.catalog_refresh / core.ann_index) serves as the
+# circuit-breaker fallback, or as the primary store with VECTOR_BACKEND=local
+local_index = load_local_index()
+vector_client = VectorStoreClient("shl", fallback=local_index)
+index = local_index if os.getenv("VECTOR_BACKEND") == "local" and local_index is not None else vector_client
 
 model = SentenceTransformer("all-MiniLM-L6-v2")
 
-TEST_TYPE_MAP = {
-    "A": "Ability & Aptitude",
-    "B": "Biodata & Situational Judgement",
-    "C": "Competencies",
-    "D": "Development & 360",
-    "E": "Assessment Exercises",
-    "K": "Knowledge & Skills",
-    "P": "Personality & Behavior",
-    "S": "Simulations"
-}
-
-def decode_test_type(code: str) -> str:
-    return ", ".join(TEST_TYPE_MAP.get(c.strip(), c) for c in code if c.strip() in TEST_TYPE_MAP)
-
+# Candidate budget for multi-skill queries, shared across the facets. Defaults
+# to the single-query top_k; lower it only after Evaluation/eval.py --candidates
+# shows candidate recall holds. FACET_CANDIDATES=0 disables decomposition (the
+# "before" side of that comparison).
+FACET_CANDIDATES = int(os.getenv("FACET_CANDIDATES", "60"))
+# Skill vocabulary for facet validation when no catalog snapshot is published yet
+_csv_vocabulary = vocabulary_from_csv(os.getenv("SKILL_VOCAB_CSV", "shl_enhanced_assessments_with_tags.csv"))
 
 def build_prompt(query: str, blocks: List[str]) -> str:
     return f"""
@@ -85,37 +68,43 @@ Assessments:
 {''.join(blocks)}
 """
 
-def retrieve_and_rerank(query: str, top_k: int = 60) -> List[Dict]:
-    query_vector = model.encode(query).tolist()
-
+def retrieve_candidates(query: str, top_k: int = 60, catalogs: Optional[Sequence[str]] = None) -> List[Dict]:
+    # Restrict to some catalogs: a metadata filter on Pinecone, partitions on the local index
+    search_filter = {"filter": {"catalog": {"$in": list(catalogs)}}} if catalogs else {}
+    facets = decompose_query(query, catalog_store.skill_vocabulary or _csv_vocabulary) if FACET_CANDIDATES > 0 else []
+    if not facets:
+        query_vector = model.encode(query).tolist()
+        response = index.query(
+            vector=query_vector,
+            top_k=top_k,
+            include_metadata=True,
+            **search_filter
+        )
+        return response['matches']
+
+    # Multi-skill query: the full query plus one sub-query per skill, encoded
+    # in one batch and searched together, then merged with per-facet quotas
+    print(" Query facets:", facets)
+    budget = min(top_k, FACET_CANDIDATES)
+    texts = [query] + facets
+    vectors = model.encode(texts, batch_size=len(texts))
+    per_facet = math.ceil(budget / len(texts)) * 2
+    responses = index.query_batch(vectors, top_k=per_facet, include_metadata=True, **search_filter)
+    return merge_facet_results([r['matches'] for r in responses], budget)
+
+def retrieve_and_rerank(query: str, top_k: int = 60, catalogs: Optional[Sequence[str]] = None) -> List[Dict]:
     # Step 1: Retrieve from Pinecone
-    response = index.query(
-        vector=query_vector,
-        top_k=top_k,
-        include_metadata=True
-    )
+    matches = retrieve_candidates(query, top_k, catalogs)
 
     # Step 2: Prepare blocks for reranking
     id_map = {}
     assessment_blocks = []
 
-    for i, match in enumerate(response['matches']):
-        md = match['metadata']
+    for i, match in enumerate(matches):
+        record = catalog_store.resolve(match['id'], match['metadata'])
         aid = str(i + 1)
-        id_map[aid] = md
-
-        tags = ", ".join(md.get("Tags", [])) if isinstance(md.get("Tags"), list) else md.get("Tags", "")
-        test_type_mapped = decode_test_type(md.get("Test Type", ""))
-
-        block = f"""{aid}. Title: {md.get('Test Name', '')}
-    Description: {md.get('Description', '')}
-    Tags: {tags}
-    Job Level: {md.get('Job Levels', '')}
-    Duration: {md.get('Assessment Length', '')}
-    Test Type: {test_type_mapped}
-    """
-
-        assessment_blocks.append(block)
+        id_map[aid] = record
+        assessment_blocks.append(f"{aid}. {record.rerank_block}")
 
     # Step 3: Build prompt & rerank
     prompt = build_prompt(query, assessment_blocks)
@@ -144,22 +133,13 @@ def retrieve_and_rerank(query: str, top_k: int = 60) -> List[Dict]:
     for item in reranked:
         aid = str(item.get("id", "")).strip().rstrip(".")
         reason = item.get("reason", "No reason given")
-        md = id_map.get(aid)
+        record = id_map.get(aid)
 
-        if not md:
+        if not record:
             print(f" ID {aid} not found in id_map — skipping.")
             continue
 
-        final_results.append({
-            "Test Name": md.get("Test Name"),
-            "Test Link": md.get("Test Link"),
-            "Description": md.get("Description"),
-            "Assessment Length": md.get("Assessment Length"),
-            "Remote Support": md.get("Remote Testing") or "No",
-            "Adaptive Support": md.get("Adaptive/IRT") or "No",
-            "Test Type": md.get("Test Type"),
-            "Reason": reason
-        })
+        final_results.append({**record.result, "Reason": reason})
 
     print("Final results count:", len(final_results))
     return final_results
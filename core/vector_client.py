@@ -0,0 +1,335 @@
+import os
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Optional
+from pinecone import Pinecone
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError, TimeoutError as Urllib3Timeout
+
+
+class VectorStoreUnavailable(RuntimeError):
+    """Raised when the remote store is failing and the call cannot be served locally."""
+
+
+# Only reads may be served by the local backend; a write that "succeeds"
+# locally would silently diverge the remote index from the catalog snapshot.
+READ_METHODS = {"query", "query_batch", "fetch"}
+
+
+def _status(error: Exception) -> Optional[int]:
+    status = getattr(error, "status", None) or getattr(error, "status_code", None)
+    try:
+        return int(status)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_throttled(error: Exception) -> bool:
+    """429 rate limiting: worth retrying with backoff, but says nothing bad about the store's health."""
+    return _status(error) == 429
+
+
+def is_retryable(error: Exception) -> bool:
+    """Timeouts, connection errors, 429s and 5xx responses; other 4xx client errors are not retried."""
+    if isinstance(error, (FutureTimeout, TimeoutError, ConnectionError,
+                          Urllib3Timeout, MaxRetryError, NewConnectionError, ProtocolError)):
+        return True
+    status = _status(error)
+    return status is not None and (status == 429 or status >= 500)
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker.
+
+    closed    -> calls go through; consecutive failures are counted
+    open      -> calls fail fast until `reset_timeout` seconds have passed
+    half_open -> one trial call is let through; success closes, failure re-opens
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def is_open(self) -> bool:
+        """True while calls would be rejected (does not claim the half-open trial)."""
+        with self._lock:
+            if self.state == self.OPEN:
+                return time.monotonic() - self.opened_at < self.reset_timeout
+            return self.state == self.HALF_OPEN and self._trial_in_flight
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def release(self):
+        """End a half-open trial without a verdict (e.g. the call failed with a client error)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                    print(f" Circuit breaker OPEN after {self.failures} failure(s)")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class VectorStoreClient:
+    """
+    Wrapper around a Pinecone index that adds:
+    - a single reused Pinecone client / index connection (pooled HTTP threads)
+    - a timeout on every call
+    - exponential-backoff retries with jitter (also for 429 rate limiting,
+      which does not count toward the circuit breaker)
+    - optional hedged queries (a second request is fired if the first one is
+      slower than the observed p95 latency; whichever returns first wins)
+    - a circuit breaker that fails fast, or switches to `fallback`, when the
+      remote store is degraded
+
+    `fallback` is any object exposing the same `query(...)` signature as a
+    Pinecone index (e.g. a local in-process index). It only serves reads;
+    writes raise VectorStoreUnavailable while the remote store is down.
+    """
+
+    def __init__(
+        self,
+        index_name: str = "shl",
+        api_key: Optional[str] = None,
+        timeout: float = float(os.getenv("VECTOR_TIMEOUT", "5")),
+        max_retries: int = int(os.getenv("VECTOR_MAX_RETRIES", "3")),
+        backoff_base: float = 0.25,
+        backoff_max: float = 4.0,
+        hedge: bool = os.getenv("VECTOR_HEDGE", "1") == "1",
+        hedge_min_samples: int = 20,
+        pool_threads: int = int(os.getenv("VECTOR_POOL_THREADS", "8")),
+        breaker: Optional[CircuitBreaker] = None,
+        fallback: Any = None,
+    ):
+        self.index_name = index_name
+        self.api_key = api_key or os.getenv("PINECONE_API_KEY")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.pool_threads = pool_threads
+        self.breaker = breaker or CircuitBreaker()
+        self.fallback = fallback
+
+        self._index = None
+        self._connect_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=pool_threads, thread_name_prefix="vector")
+        # separate pool so fanned-out queries never wait on their own call slots
+        self._fanout = ThreadPoolExecutor(max_workers=pool_threads, thread_name_prefix="vector-fanout")
+        self._latencies = deque(maxlen=500)
+        self._stats_lock = threading.Lock()
+        self._counters = {
+            "calls": 0,
+            "retries": 0,
+            "timeouts": 0,
+            "throttled": 0,
+            "failures": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+            "rejected": 0,
+            "fallback_calls": 0,
+        }
+
+    # --- connection -------------------------------------------------------
+
+    @property
+    def index(self):
+        if self._index is None:
+            with self._connect_lock:
+                if self._index is None:
+                    pc = Pinecone(api_key=self.api_key)
+                    self._index = pc.Index(self.index_name, pool_threads=self.pool_threads)
+        return self._index
+
+    def _reset_connection(self):
+        with self._connect_lock:
+            self._index = None
+
+    # --- metrics ----------------------------------------------------------
+
+    def _incr(self, key: str, n: int = 1):
+        with self._stats_lock:
+            self._counters[key] += n
+
+    def _record_latency(self, seconds: float):
+        with self._stats_lock:
+            self._latencies.append(seconds)
+
+    def latency_percentile(self, pct: float) -> Optional[float]:
+        with self._stats_lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return None
+        idx = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[idx]
+
+    def metrics(self) -> Dict:
+        with self._stats_lock:
+            counters = dict(self._counters)
+            samples = len(self._latencies)
+        p50 = self.latency_percentile(50)
+        p95 = self.latency_percentile(95)
+        return {
+            **counters,
+            "breaker_state": self.breaker.state,
+            "breaker_failures": self.breaker.failures,
+            "breaker_times_opened": self.breaker.times_opened,
+            "latency_samples": samples,
+            "latency_p50_ms": round(p50 * 1000, 2) if p50 is not None else None,
+            "latency_p95_ms": round(p95 * 1000, 2) if p95 is not None else None,
+        }
+
+    # --- call machinery ---------------------------------------------------
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.hedge or len(self._latencies) < self.hedge_min_samples:
+            return None
+        p95 = self.latency_percentile(95)
+        if p95 is None or p95 >= self.timeout:
+            return None
+        return p95
+
+    def _attempt(self, fn: Callable, hedgeable: bool, **kwargs):
+        start = time.monotonic()
+        primary = self._executor.submit(fn, **kwargs)
+        pending = {primary}
+
+        delay = self._hedge_delay() if hedgeable else None
+        if delay is not None:
+            done, _ = wait(pending, timeout=delay)
+            if not done:
+                self._incr("hedged")
+                pending.add(self._executor.submit(fn, **kwargs))
+
+        deadline = start + self.timeout
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for fut in done:
+                if fut.exception() is None:
+                    if fut is not primary:
+                        self._incr("hedge_wins")
+                    self._record_latency(time.monotonic() - start)
+                    return fut.result()
+            if not pending:
+                # every request raised — surface the last error
+                raise next(iter(done)).exception()
+
+        for fut in pending:
+            fut.cancel()
+        self._incr("timeouts")
+        raise FutureTimeout(f"vector store call exceeded {self.timeout}s")
+
+    def _call(self, method: str, hedgeable: bool = False, **kwargs):
+        self._incr("calls")
+
+        if not self.breaker.allow():
+            self._incr("rejected")
+            return self._fallback(method, RuntimeError("circuit breaker open"), **kwargs)
+
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._incr("retries")
+                sleep_for = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+                time.sleep(random.uniform(0, sleep_for))
+            try:
+                result = self._attempt(getattr(self.index, method), hedgeable, **kwargs)
+                self.breaker.record_success()
+                return result
+            except Exception as e:
+                if not is_retryable(e):
+                    # the store answered; a bad request says nothing about its health
+                    self.breaker.release()
+                    raise
+                last_error = e
+                if is_throttled(e):
+                    # rate limited: back off and retry, but don't count it against the breaker
+                    self._incr("throttled")
+                    print(f" Vector store {method} throttled (attempt {attempt + 1}/{self.max_retries + 1})")
+                    continue
+                self._incr("failures")
+                print(f" Vector store {method} failed (attempt {attempt + 1}/{self.max_retries + 1}): {e}")
+                if not isinstance(e, FutureTimeout):
+                    self._reset_connection()
+                self.breaker.record_failure()
+                if self.breaker.state == CircuitBreaker.OPEN:
+                    break
+
+        if is_throttled(last_error):
+            self.breaker.release()
+        return self._fallback(method, last_error, **kwargs)
+
+    def _fallback(self, method: str, error: Exception, **kwargs):
+        if method in READ_METHODS and self.fallback is not None and hasattr(self.fallback, method):
+            self._incr("fallback_calls")
+            print(f" Falling back to local backend for {method}")
+            return getattr(self.fallback, method)(**kwargs)
+        raise VectorStoreUnavailable(f"Vector store unavailable: {error}")
+
+    # --- index API --------------------------------------------------------
+
+    def query(self, **kwargs):
+        return self._call("query", hedgeable=True, **kwargs)
+
+    def query_batch(self, vectors, **kwargs):
+        """Pinecone has no multi-vector query, so fan out concurrently (or hand the batch to the local backend)."""
+        if self.breaker.is_open() and self.fallback is not None and hasattr(self.fallback, "query_batch"):
+            self._incr("rejected")
+            self._incr("fallback_calls")
+            return self.fallback.query_batch(vectors, **kwargs)
+        futures = [self._fanout.submit(self.query, vector=v.tolist() if hasattr(v, "tolist") else list(v), **kwargs) for v in vectors]
+        return [f.result() for f in futures]
+
+    def upsert(self, **kwargs):
+        return self._call("upsert", **kwargs)
+
+    def delete(self, **kwargs):
+        return self._call("delete", **kwargs)
+
+    def fetch(self, **kwargs):
+        return self._call("fetch", hedgeable=True, **kwargs)
+
+    def list_paginated(self, **kwargs):
+        return self._call("list_paginated", **kwargs)
+
+    def update(self, **kwargs):
+        return self._call("update", **kwargs)
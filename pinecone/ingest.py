@@ -1,8 +1,8 @@
 import os
 import time
 import ast
+import hashlib
 import pandas as pd
-from uuid import uuid4
 from sentence_transformers import SentenceTransformer
 from pinecone import Pinecone, ServerlessSpec
 from dotenv import load_dotenv
@@ -34,6 +34,11 @@ model = SentenceTransformer("all-MiniLM-L6-v2")
 batch_size = 25
 vectors_to_upsert = []
 
+def assessment_id(test_link: str) -> str:
+    # Stable ID from the Test Link; must match core.catalog_refresh.assessment_id
+    normalized = test_link.strip().lower().rstrip("/")
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
 def parse_tags(tag_value):
     try:
         tags = ast.literal_eval(tag_value) if isinstance(tag_value, str) else tag_value
@@ -56,9 +61,10 @@ for i, row in df.iterrows():
         "Adaptive/IRT": str(row["Adaptive/IRT"]),
         "Test Type": str(row["Test Type"]),
         "Tags": parse_tags(row["Tags"]),
+        "catalog": "shl",
     }
 
-    vector = (str(uuid4()), embedding, metadata)
+    vector = (assessment_id(str(row["Test Link"])), embedding, metadata)
     vectors_to_upsert.append(vector)
 
     if len(vectors_to_upsert) == batch_size or i == len(df) - 1: